@@ -1,9 +1,16 @@
 import os
-import json
+import orjson
+import ijson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import re
+import itertools
 import hashlib
+import xxhash
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from flatten_json import flatten
 from dateutil import parser
 from tqdm import tqdm
@@ -11,86 +18,247 @@ from tqdm import tqdm
 # === CONFIGURATION ===
 ROOT_FOLDER = 'instagram_jsons'  # Your Instagram JSON export folder root
 OUTPUT_FOLDER = 'cleaned_csvs'       # Folder to save cleaned CSVs
+OUTPUT_FORMAT = 'csv'                      # 'csv', or 'parquet' for typed, zstd-compressed files
 REMOVE_EMOJIS = False                      # Set True to remove emojis and special chars from strings
 GENERATE_UNIQUE_IDS = True                 # Auto-generate IDs if missing
+ID_HASH = 'xxh64'                          # Hash for generated IDs: 'xxh64' (fast) or 'md5' (audit/reproducibility)
+DEDUP_FILE_PREFIXES = ('followers', 'following', 'connections')  # Exports prone to repeated rows; always deduplicated
 DATE_FEATURES_EXTRACTION = True            # Add year/month/day etc. from date columns
 LOG_FILE = 'processing.log'                # Log file for actions and errors
-
-logging.basicConfig(filename=LOG_FILE,
-                    filemode='w',
-                    level=logging.INFO,
-                    format='%(asctime)s %(levelname)s: %(message)s')
+USE_ARROW_CSV = True                       # Write CSVs with pyarrow's C++ writer (falls back to pandas)
+STREAM_THRESHOLD_BYTES = 10 * 1024 * 1024  # Stream JSON files larger than this with ijson instead of loading them whole
+MAX_WORKERS = None                         # Worker processes for per-file processing (None = all cores)
+FILES_PER_TASK = 8                         # Files per worker task; reads/writes within a task overlap compute
+
+def setup_logging(filemode='w'):
+    # Workers append to the log the main process truncated
+    logging.basicConfig(filename=LOG_FILE,
+                        filemode=filemode,
+                        level=logging.INFO,
+                        format='%(asctime)s %(levelname)s: %(message)s')
+
+# Pattern covers a wide emoji range; compiled once and applied column-wise
+EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # Emoticons
+    "\U0001F300-\U0001F5FF"  # Symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # Transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # Flags
+    "\U00002500-\U00002BEF"  # Chinese chars + symbols
+    "\U00002702-\U000027B0"
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "\U0001f926-\U0001f937"
+    "\U00010000-\U0010ffff"
+    "\u2640-\u2642"
+    "\u2600-\u2B55"
+    "\u200d"
+    "\u23cf"
+    "\u23e9"
+    "\u231a"
+    "\ufe0f"  # Dingbats
+    "\u3030"
+    "]+", flags=re.UNICODE)
+# Other control or non-printable chars
+CTRL_RE = re.compile(r'[\x00-\x1F\x7F]')
+# Spaces, dots and hyphens in column names become underscores
+_COL_TRANS = str.maketrans({' ': '_', '.': '_', '-': '_'})
+# Column-name keywords for date and count/metric fields
+DATE_RE = re.compile(r'date|time|timestamp')
+METRIC_RE = re.compile(r'count|likes|comments|engagement|views|followers|following')
+
+# Common keys holding the list of records, in priority order
+RECORD_KEYS = ['list', 'messages', 'media', 'connections', 'string_list_data', 'profile_changes', 'followers', 'following', 'ads', 'ads_information', 'items']
 
 # === UTILS ===
-def remove_emojis_and_specials(text):
-    # Removes emojis and control special characters, retaining normal text chars
-    if not isinstance(text, str):
-        return text
-    try:
-        # Pattern covers a wide emoji range
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # Emoticons
-            "\U0001F300-\U0001F5FF"  # Symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # Transport & map symbols
-            "\U0001F1E0-\U0001F1FF"  # Flags
-            "\U00002500-\U00002BEF"  # Chinese chars + symbols
-            "\U00002702-\U000027B0"
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0001F251"
-            "\U0001f926-\U0001f937"
-            "\U00010000-\U0010ffff"
-            "\u2640-\u2642"
-            "\u2600-\u2B55"
-            "\u200d"
-            "\u23cf"
-            "\u23e9"
-            "\u231a"
-            "\ufe0f"  # Dingbats
-            "\u3030"
-            "]+", flags=re.UNICODE)
-        cleaned = emoji_pattern.sub(r'', text)
-        # Also strip other control or non-printable chars
-        cleaned = re.sub(r'[\x00-\x1F\x7F]', '', cleaned)
-        return cleaned.strip()
-    except Exception:
-        return text
+def remove_emojis_and_specials(series):
+    """
+    Removes emojis and control special characters from a string Series,
+    retaining normal text chars. Non-string values are left untouched.
+    """
+    # Pass pattern strings so Arrow-backed columns use Arrow's regex kernel
+    cleaned = series.str.replace(EMOJI_RE.pattern, '', regex=True).str.replace(CTRL_RE.pattern, '', regex=True).str.strip()
+    return cleaned.fillna(series)
 
 def flatten_json(y, parent_key='', sep='_'):
     """
-    Recursively flattens a nested JSON/dictionary.
+    Iteratively flattens a nested JSON/dictionary using an explicit stack.
     Nested keys get joined with 'sep'.
     For lists of dicts, each item gets an index in key.
     For lists of primitives, joins as comma-separated string.
     """
     out = {}
-    def flatten(x, name=''):
+    # Stack of (value, key parts); children pushed in reverse to keep document order
+    stack = [(y, [parent_key] if parent_key else [])]
+    while stack:
+        x, parts = stack.pop()
         if isinstance(x, dict):
-            for a in x:
-                flatten(x[a], f"{name}{a}{sep}")
+            stack.extend((v, parts + [k]) for k, v in reversed(x.items()))
         elif isinstance(x, list):
             if all(isinstance(i, dict) for i in x):
-                for idx, a in enumerate(x):
-                    flatten(a, f"{name}{idx}{sep}")
+                stack.extend((a, parts + [str(idx)]) for idx, a in reversed(list(enumerate(x))))
             else:
-                out[name[:-1]] = ', '.join([str(i) for i in x])
+                out[sep.join(parts)] = ', '.join([str(i) for i in x])
         else:
-            out[name[:-1]] = x
-    flatten(y, parent_key)
+            out[sep.join(parts)] = x
     return out
 
-def json_file_to_flat_records(json_path):
+# Files sharing a basename (e.g. every thread's message_1.json) share a layout,
+# so record shapes that keep recurring get a generated flattener
+_SHAPE_COUNTS = {}      # (basename, flat keys) -> times flattened generically
+_SHAPE_FLATTENERS = {}  # (basename, flat keys) -> generated flattener
+_FLATTENER_CACHE = {}   # (basename, top-level keys) -> flattener for the latest shape
+_SPECIALIZE_AFTER = 3         # generic flattens of a shape before generating code for it
+_SPECIALIZE_MAX_LEAVES = 200  # wider shapes cost more to compile than they save
+
+def generate_flattener(record, sep='_'):
+    """
+    Generates and compiles a flattener specialized to the exact shape of
+    record. Dict walks and output keys are hard-coded, so there is no
+    per-leaf dispatch or key building. Output matches flatten_json; records
+    of any other shape make it return None.
+    """
+    lines = ['def flatten(r):', '    out = {}']
+    consts = {}
+    names = (f'v{i}' for i in itertools.count())
+    stack = [('r', record, ())]
+    while stack:
+        var, x, parts = stack.pop()
+        if isinstance(x, dict):
+            const = f'K{len(consts)}'
+            consts[const] = tuple(x)
+            lines.append(f'    if not isinstance({var}, dict) or tuple({var}) != {const}: return None')
+            if x:
+                children = [(next(names), v, parts + (k,)) for k, v in x.items()]
+                lines.append(f"    {', '.join(c[0] for c in children)}, = {var}.values()")
+                stack.extend(reversed(children))
+        elif isinstance(x, list) and all(isinstance(i, dict) for i in x):
+            lines.append(f'    if not isinstance({var}, list) or len({var}) != {len(x)}: return None')
+            if x:
+                children = [(next(names), a, parts + (str(idx),)) for idx, a in enumerate(x)]
+                lines.append(f"    {', '.join(c[0] for c in children)}, = {var}")
+                stack.extend(reversed(children))
+        elif isinstance(x, list):
+            lines.append(f'    if not isinstance({var}, list) or all(isinstance(i, dict) for i in {var}): return None')
+            lines.append(f"    out[{sep.join(parts)!r}] = ', '.join([str(i) for i in {var}])")
+        else:
+            lines.append(f'    if isinstance({var}, (dict, list)): return None')
+            lines.append(f'    out[{sep.join(parts)!r}] = {var}')
+    lines.append('    return out')
+    namespace = dict(consts)
+    exec('\n'.join(lines), namespace)
+    return namespace['flatten']
+
+def flatten_record(record, basename):
+    """
+    Flattens one record, using the generated flattener for its shape when
+    files with this basename have produced it often enough.
+    """
+    top_key = (basename, tuple(record) if isinstance(record, dict) else None)
+    flattener = _FLATTENER_CACHE.get(top_key)
+    if flattener is not None:
+        flat = flattener(record)
+        if flat is not None:
+            return flat
+
+    flat = flatten_json(record)
+    if len(flat) > _SPECIALIZE_MAX_LEAVES:
+        return flat
+    shape_key = (basename, tuple(flat))
+    flattener = _SHAPE_FLATTENERS.get(shape_key)
+    if flattener is None:
+        _SHAPE_COUNTS[shape_key] = _SHAPE_COUNTS.get(shape_key, 0) + 1
+        if _SHAPE_COUNTS[shape_key] >= _SPECIALIZE_AFTER:
+            flattener = _SHAPE_FLATTENERS[shape_key] = generate_flattener(record)
+    if flattener is not None:
+        _FLATTENER_CACHE[top_key] = flattener
+    return flat
+
+def records_to_columns(records, basename):
+    """
+    Flattens records straight into a columnar dict {flat_key: [values]}.
+    Keys a record lacks are padded with None, so every column holds one
+    value per record and the DataFrame is built without a key-union pass.
+    """
+    columns = {}
+    for n_rows, record in enumerate(records):
+        flat = flatten_record(record, basename)
+        for key, value in flat.items():
+            col = columns.get(key)
+            if col is None:
+                col = columns[key] = [None] * n_rows
+            col.append(value)
+        if len(flat) < len(columns):
+            for col in columns.values():
+                if len(col) == n_rows:
+                    col.append(None)
+    return columns
+
+def find_records_key(json_path):
+    """
+    Scans a JSON file with ijson (without building it in memory) and returns
+    the key of its record array, using the same key priority as
+    json_file_to_flat_columns. Returns '' for a top-level list, or None if
+    records can't be streamed.
+    """
+    array_keys = set()
+    with open(json_path, 'rb') as f:
+        for prefix, event, _ in ijson.parse(f):
+            if event != 'start_array':
+                continue
+            if prefix == '':
+                return ''  # top-level list
+            if '.' not in prefix:
+                array_keys.add(prefix)
+    for try_key in RECORD_KEYS:
+        if try_key in array_keys:
+            return try_key
+    return None
+
+def stream_flat_columns(json_path, record_key, basename):
     """
-    Loads a JSON file and returns a list of flat dicts—one per top-level record.
+    Streams the records under record_key ('' for a top-level list) with ijson
+    and flattens them one at a time into columns.
+    """
+    prefix = f'{record_key}.item' if record_key else 'item'
+    with open(json_path, 'rb') as f:
+        return records_to_columns(ijson.items(f, prefix, use_float=True), basename)
+
+def read_small_json(json_path):
+    """
+    Returns the raw bytes of a JSON file small enough to load whole, or None
+    for files that will be streamed (or can't be read here).
+    """
+    try:
+        if os.path.getsize(json_path) > STREAM_THRESHOLD_BYTES:
+            return None
+        with open(json_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None  # reported when the file is processed
+
+def json_file_to_flat_columns(json_path, raw=None):
+    """
+    Loads a JSON file (or its already-read raw bytes) and returns its
+    flattened top-level records as a columnar dict {flat_key: [values]}.
     Handles varied Instagram JSON structures.
+    Large files are streamed record by record so the parsed document is never held in memory.
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    basename = os.path.basename(json_path)
+    if raw is None and os.path.getsize(json_path) > STREAM_THRESHOLD_BYTES:
+        record_key = find_records_key(json_path)
+        if record_key is not None:
+            return stream_flat_columns(json_path, record_key, basename)
+
+    if raw is None:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+    data = orjson.loads(raw)
 
     # Detect the outer structure:
     if isinstance(data, dict):
         # Try common keys with list values
-        for try_key in ['list', 'messages', 'media', 'connections', 'string_list_data', 'profile_changes', 'followers', 'following', 'ads', 'ads_information', 'items']:
+        for try_key in RECORD_KEYS:
             if try_key in data and isinstance(data[try_key], list):
                 data = data[try_key]
                 break
@@ -101,74 +269,126 @@ def json_file_to_flat_records(json_path):
     else:
         data = [data]
 
-    flat_records = []
-    for record in data:
-        flat_records.append(flatten_json(record))
-    return flat_records
+    return records_to_columns(data, basename)
+
+def to_arrow_strings(df):
+    """
+    Casts object columns holding only strings to 'string[pyarrow]' so the
+    .str methods used downstream run on Arrow's C++ kernels. Columns that
+    already have a string dtype are left alone and never re-inferred.
+    """
+    str_cols = [c for c in df.columns[df.dtypes == object]
+                if pd.api.types.infer_dtype(df[c], skipna=True) == 'string']
+    return df.astype({c: 'string[pyarrow]' for c in str_cols})
 
-def clean_and_standardize(df):
-    # Remove duplicates & fully empty cols
-    df = df.drop_duplicates()
+def parse_date_column(series, col):
+    """
+    Parses a date-like column to UTC datetimes.
+    Unix epoch columns (numeric, or digit strings of epoch length) are
+    converted numerically, ISO-8601 strings take the fixed-format fast path,
+    and only columns that mostly fail that fall back to the general
+    (dateutil) parser. Compact dates such as '20230101' are not epochs.
+    """
+    unit = 'ms' if col.endswith('_ms') else 's'
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.to_datetime(series, unit=unit, utc=True, errors='coerce')
+    values = series[series.notna() & (series != '')].astype(str)
+    epoch_re = r'\d{12,13}(\.0)?' if unit == 'ms' else r'\d{9,10}(\.0)?'
+    if not values.empty and values.str.fullmatch(epoch_re).all():
+        return pd.to_datetime(pd.to_numeric(series, errors='coerce'), unit=unit, utc=True, errors='coerce')
+    parsed = pd.to_datetime(series, format='ISO8601', utc=True, errors='coerce')
+    if parsed[values.index].isna().mean() < 0.5:
+        return parsed
+    return pd.to_datetime(series, errors='coerce', utc=True)
+
+def to_int_metric(series):
+    """
+    Casts a count/metric column to int; blank or unparsable values become 0.
+    String columns whose sampled values are all clean integers are cast
+    directly (an Arrow kernel for string[pyarrow]) instead of pd.to_numeric.
+    """
+    if isinstance(series.dtype, pd.StringDtype):
+        sample = series[series.ne('')].head(100)
+        if sample.str.fullmatch(r'-?\d+').all():
+            try:
+                return series.replace('', '0').astype('int64')
+            except (ValueError, TypeError, OverflowError):
+                pass  # a later row isn't a clean int; parse leniently below
+    return pd.to_numeric(series, errors='coerce').fillna(0).astype(int)
+
+def clean_and_standardize(df, dedup=True, dedup_subset=None):
+    # Remove duplicates (optionally judged on a key subset) & fully empty cols
+    if dedup:
+        df = df.drop_duplicates(subset=dedup_subset)
     df = df.dropna(axis=1, how='all')
-    df = df.fillna('')
+    # Fill only text columns so numeric dtypes survive; metrics get 0 below, dates stay NaT
+    text_cols = df.select_dtypes(include=['object', 'string']).columns
+    df[text_cols] = df[text_cols].fillna('')
 
     # Clean column names (strip, replace spaces/dots/hyphens with underscore, lowercase)
-    df.columns = [c.strip().replace(' ', '_').replace('.', '_').replace('-', '_').lower() for c in df.columns]
+    df.columns = [c.strip().translate(_COL_TRANS).lower() for c in df.columns]
 
     # Optional: Remove emojis/special chars in all string columns
     if REMOVE_EMOJIS:
-        str_cols = df.select_dtypes(include=['object']).columns
+        str_cols = df.select_dtypes(include=['object', 'string']).columns
         for c in str_cols:
-            df[c] = df[c].apply(remove_emojis_and_specials)
+            df[c] = remove_emojis_and_specials(df[c])
 
     # Attempt to parse dates; unify to UTC ISO format
-    date_cols = [col for col in df.columns if any(x in col for x in ['date', 'time', 'timestamp'])]
+    date_cols = df.columns[df.columns.str.contains(DATE_RE)].tolist()
     for col in date_cols:
         try:
-            df[col] = pd.to_datetime(df[col], errors='coerce', utc=True)
+            df[col] = parse_date_column(df[col], col)
         except Exception:
             pass  # ignore parse errors
 
     # Extract date parts for easier BI grouping (optional)
+    # Parts are collected and added with one concat, as small nullable ints
     if DATE_FEATURES_EXTRACTION:
+        date_parts = {}
         for col in date_cols:
             if col in df.columns and pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[f'{col}_year'] = df[col].dt.year
-                df[f'{col}_month'] = df[col].dt.month
-                df[f'{col}_day'] = df[col].dt.day
-                df[f'{col}_weekday'] = df[col].dt.weekday
-                df[f'{col}_hour'] = df[col].dt.hour
+                dt = df[col].dt
+                date_parts[f'{col}_year'] = dt.year.astype('Int16')
+                date_parts[f'{col}_month'] = dt.month.astype('Int8')
+                date_parts[f'{col}_day'] = dt.day.astype('Int8')
+                date_parts[f'{col}_weekday'] = dt.weekday.astype('Int8')
+                date_parts[f'{col}_hour'] = dt.hour.astype('Int8')
+        if date_parts:
+            df = pd.concat([df, pd.DataFrame(date_parts, index=df.index)], axis=1)
 
     # Numeric type enforcement: try to cast obvious count/metric fields
-    metric_like_cols = [c for c in df.columns if any(k in c for k in ['count', 'likes', 'comments', 'engagement', 'views', 'followers', 'following'])]
+    metric_like_cols = df.columns[df.columns.str.contains(METRIC_RE)].tolist()
     for col in metric_like_cols:
         try:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+            df[col] = to_int_metric(df[col])
         except Exception:
             continue
 
-    # Map certain coded values (example: media_type)
+    # Map certain coded values (example: media_type); stored as a categorical of strings
     if 'media_type' in df.columns:
         media_map = {1: 'photo', 2: 'video', 8: 'carousel'}
-        df['media_type'] = df['media_type'].map(media_map).fillna(df['media_type'])
+        df['media_type'] = df['media_type'].replace(media_map).astype('string').astype('category')
 
-    # Trim whitespace from strings in object columns
-    obj_cols = df.select_dtypes(include=['object']).columns
-    for col in obj_cols:
-        df[col] = df[col].astype(str).str.strip()
+    # Trim whitespace from strings in object/string columns
+    obj_cols = df.select_dtypes(include=['object', 'string']).columns
+    df[obj_cols] = df[obj_cols].astype('string[pyarrow]').apply(lambda s: s.str.strip())
 
     return df
 
-def create_unique_id(row, keys=[]):
+def create_unique_ids(df, keys=[]):
     """
-    Create a hash-based unique ID from row values of specified keys.
-    If keys empty, use all columns.
+    Create hash-based unique IDs for every row from values of specified keys.
+    If keys empty, use all columns. Keys are joined row-wise over one object
+    array, which stays cheap for both wide and tall frames, then hashed with
+    ID_HASH.
     """
-    if keys:
-        key_str = '||'.join(str(row[k]) for k in keys if k in row and pd.notna(row[k]))
-    else:
-        key_str = '||'.join(str(v) for v in row)
-    return hashlib.md5(key_str.encode('utf-8')).hexdigest()
+    cols = [k for k in keys if k in df.columns]
+    values = (df[cols] if cols else df).to_numpy(dtype=object, copy=True)
+    values[pd.isna(values)] = ''
+    keys_bytes = ['||'.join(map(str, row)).encode('utf-8') for row in values]
+    hash_fn = (lambda b: hashlib.md5(b).hexdigest()) if ID_HASH == 'md5' else xxhash.xxh64_hexdigest
+    return pd.Series([hash_fn(b) for b in keys_bytes], index=df.index)
 
 def extract_one_to_many_tables(df, original_prefix, key_name='id'):
     """
@@ -181,85 +401,190 @@ def extract_one_to_many_tables(df, original_prefix, key_name='id'):
     # Candidates for splitting: columns where values contain commas or index-like suffixes
     # We'll pick columns ending with '_list', or columns containing ','
 
-    # Try detecting hashtags or similar list fields
-    for col in df.columns:
-        if isinstance(df[col].dtype, pd.StringDtype) or df[col].dtype == object:
-            if df[col].str.contains(',').any():
-                # Split comma-separated values to rows with link to main table
-                records = []
-                for idx, val in df[[key_name, col]].dropna().iterrows():
-                    main_id = val[key_name]
-                    if isinstance(val[col], str):
-                        items = [x.strip() for x in val[col].split(',')]
-                        for i, item in enumerate(items):
-                            if item:
-                                records.append({key_name: main_id, f'{col}_item': item, 'index': i})
-
-                if records:
-                    table_df = pd.DataFrame(records)
-                    table_name = f"{original_prefix}_{col}_table"
-                    tables[table_name] = table_df
-
-                    # Clean main df column since split out
-                    df[col] = df[col].apply(lambda s: '' if isinstance(s, str) else s)
+    # Try detecting hashtags or similar list fields (literal comma search, string columns only)
+    candidate_cols = [c for c in df.select_dtypes(include=['object', 'string']).columns
+                      if df[c].str.contains(',', regex=False, na=False).any()]
+    for col in candidate_cols:
+        # Split comma-separated values to rows with link to main table
+        items = df[col].str.split(',').explode().str.strip().to_frame(f'{col}_item')
+        items['index'] = items.groupby(level=0).cumcount()
+        items.insert(0, key_name, df.loc[items.index, key_name].to_numpy())
+        items = items[items[key_name].notna() & items[f'{col}_item'].notna() & items[f'{col}_item'].ne('')]
+
+        if not items.empty:
+            table_df = items.reset_index(drop=True)
+            table_name = f"{original_prefix}_{col}_table"
+            tables[table_name] = table_df
+
+            # Clean main df column since split out
+            df[col] = df[col].apply(lambda s: '' if isinstance(s, str) else s)
     return tables
 
-def process_all_jsons(input_root, output_root):
-    summary = {'processed_files': [], 'errors': [], 'empty_files': [], 'tables_created': []}
+def write_csv(df, path):
+    """
+    Writes a DataFrame to CSV, using pyarrow's C++ CSV writer when enabled.
+    Falls back to pandas for frames Arrow can't type (e.g. mixed object columns).
+    """
+    if USE_ARROW_CSV:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            pacsv.write_csv(table, path, pacsv.WriteOptions(quoting_style='needed'))
+            return
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            pass
+    df.to_csv(path, index=False)
+
+def write_parquet(df, path):
+    """
+    Writes a DataFrame to zstd-compressed Parquet.
+    Mixed object columns Arrow can't type are stored as strings.
+    """
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        obj_cols = df.columns[df.dtypes == object]
+        table = pa.Table.from_pandas(df.astype({c: 'string[pyarrow]' for c in obj_cols}), preserve_index=False)
+    pq.write_table(table, path, compression='zstd')
 
-    for folder, _, files in os.walk(input_root):
-        for filename in files:
-            if not filename.lower().endswith('.json'):
-                continue
-            json_path = os.path.join(folder, filename)
-            rel_folder = os.path.relpath(folder, input_root)
-            out_dir = os.path.join(output_root, rel_folder)
-            os.makedirs(out_dir, exist_ok=True)
-            csv_out_base = filename.replace('.json', '_cleaned.csv')
-            csv_out = os.path.join(out_dir, csv_out_base)
+def write_table(df, path_base):
+    """
+    Writes a DataFrame in OUTPUT_FORMAT to path_base plus the matching
+    extension and returns the written path.
+    """
+    if OUTPUT_FORMAT == 'parquet':
+        path = f"{path_base}.parquet"
+        write_parquet(df, path)
+    else:
+        path = f"{path_base}.csv"
+        write_csv(df, path)
+    return path
 
-            try:
-                records = json_file_to_flat_records(json_path)
-                if not records:
-                    logging.warning(f"Skipped empty file: {json_path}")
-                    summary['empty_files'].append(json_path)
-                    continue
-
-                df = pd.DataFrame(records)
-                if df.empty:
-                    logging.warning(f"Empty dataframe after loading records: {json_path}")
-                    summary['empty_files'].append(json_path)
-                    continue
-
-                # Generate unique ids if missing; prefer keys named *_id else generate
-                id_cols = [c for c in df.columns if c.endswith('_id')]
-                if GENERATE_UNIQUE_IDS and not id_cols:
-                    df['unique_id'] = [create_unique_id(row) for i, row in df.iterrows()]
-                    id_cols = ['unique_id']
-
-                df = clean_and_standardize(df)
-
-                # Extract one-to-many relationship tables (e.g., hashtags)
-                aux_tables = {}
-                if id_cols:
-                    key_col = id_cols[0]
-                    aux_tables = extract_one_to_many_tables(df, original_prefix=os.path.splitext(filename)[0], key_name=key_col)
-
-                # Save main cleaned table
-                df.to_csv(csv_out, index=False)
-                summary['processed_files'].append(csv_out)
-                logging.info(f"Processed and saved: {csv_out}")
-
-                # Save auxiliary tables, if any
-                for tbl_name, tbl_df in aux_tables.items():
-                    aux_path = os.path.join(out_dir, f"{tbl_name}.csv")
-                    tbl_df.to_csv(aux_path, index=False)
-                    summary['tables_created'].append(aux_path)
-                    logging.info(f"Created relational table: {aux_path}")
+def new_summary():
+    return {'processed_files': [], 'errors': [], 'empty_files': [], 'tables_created': []}
+
+def merge_summary(summary, other):
+    for key, items in other.items():
+        summary[key].extend(items)
+
+def build_file_tables(json_path, input_root, output_root, raw=None):
+    """
+    Cleans a single JSON file into its main table plus any relational tables.
+    Returns (summary, tables), where tables is a list of
+    (kind, dataframe, output path without extension) still to be written.
+    """
+    summary = new_summary()
+    tables = []
+    folder, filename = os.path.split(json_path)
+    rel_folder = os.path.relpath(folder, input_root)
+    out_dir = os.path.join(output_root, rel_folder)
+    os.makedirs(out_dir, exist_ok=True)
+    out_base = os.path.join(out_dir, filename.replace('.json', '_cleaned'))
 
+    try:
+        columns = json_file_to_flat_columns(json_path, raw)
+        if not columns:
+            logging.warning(f"Skipped empty file: {json_path}")
+            summary['empty_files'].append(json_path)
+            return summary, tables
+
+        df = to_arrow_strings(pd.DataFrame(columns, copy=False))
+        if df.empty:
+            logging.warning(f"Empty dataframe after loading records: {json_path}")
+            summary['empty_files'].append(json_path)
+            return summary, tables
+
+        # Generate unique ids if missing; prefer keys named *_id else generate
+        id_cols = [c for c in df.columns if c.endswith('_id')]
+        generated_ids = GENERATE_UNIQUE_IDS and not id_cols
+        if generated_ids:
+            df['unique_id'] = create_unique_ids(df)
+            id_cols = ['unique_id']
+
+        # Generated ids hash every column, so deduping on them alone drops the same rows;
+        # otherwise only exports prone to repeats pay for a full-row dedup
+        if generated_ids:
+            df = clean_and_standardize(df, dedup_subset=['unique_id'])
+        else:
+            df = clean_and_standardize(df, dedup=filename.lower().startswith(DEDUP_FILE_PREFIXES))
+
+        # Extract one-to-many relationship tables (e.g., hashtags)
+        aux_tables = {}
+        if id_cols:
+            key_col = id_cols[0]
+            aux_tables = extract_one_to_many_tables(df, original_prefix=os.path.splitext(filename)[0], key_name=key_col)
+
+        # Main cleaned table, then auxiliary tables, if any
+        tables.append(('main', df, out_base))
+        for tbl_name, tbl_df in aux_tables.items():
+            tables.append(('aux', tbl_df, os.path.join(out_dir, tbl_name)))
+
+    except Exception as e:
+        logging.error(f"Error processing {json_path}: {e}")
+        summary['errors'].append((json_path, str(e)))
+
+    return summary, tables
+
+def write_file_tables(json_path, tables, summary):
+    """
+    Saves the tables built for json_path and records them in its summary.
+    """
+    try:
+        for kind, df, path_base in tables:
+            out_path = write_table(df, path_base)
+            if kind == 'main':
+                summary['processed_files'].append(out_path)
+                logging.info(f"Processed and saved: {out_path}")
+            else:
+                summary['tables_created'].append(out_path)
+                logging.info(f"Created relational table: {out_path}")
+    except Exception as e:
+        logging.error(f"Error processing {json_path}: {e}")
+        summary['errors'].append((json_path, str(e)))
+    return summary
+
+def process_file_batch(json_paths, input_root, output_root):
+    """
+    Processes a batch of JSON files in one worker, overlapping I/O with compute:
+    the next file is read and the previous file's tables are written on
+    background threads while the current file is flattened and cleaned.
+    Returns the merged summary dict for the batch.
+    """
+    summary = new_summary()
+    with ThreadPoolExecutor(max_workers=2) as io_pool:
+        next_raw = io_pool.submit(read_small_json, json_paths[0]) if json_paths else None
+        pending_write = None
+        for i, json_path in enumerate(json_paths):
+            raw = next_raw.result()
+            if i + 1 < len(json_paths):
+                next_raw = io_pool.submit(read_small_json, json_paths[i + 1])
+            file_summary, tables = build_file_tables(json_path, input_root, output_root, raw)
+            if pending_write is not None:
+                merge_summary(summary, pending_write.result())
+            pending_write = io_pool.submit(write_file_tables, json_path, tables, file_summary)
+        if pending_write is not None:
+            merge_summary(summary, pending_write.result())
+    return summary
+
+def process_all_jsons(input_root, output_root):
+    setup_logging()
+    summary = new_summary()
+
+    # Files are independent, so decode/flatten/clean them in parallel processes
+    json_paths = [os.path.join(folder, filename)
+                  for folder, _, files in os.walk(input_root)
+                  for filename in files if filename.lower().endswith('.json')]
+    batches = [json_paths[i:i + FILES_PER_TASK] for i in range(0, len(json_paths), FILES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=setup_logging, initargs=('a',)) as executor:
+        futures = {executor.submit(process_file_batch, batch, input_root, output_root): batch
+                   for batch in batches}
+        for future in as_completed(futures):
+            try:
+                merge_summary(summary, future.result())
             except Exception as e:
-                logging.error(f"Error processing {json_path}: {e}")
-                summary['errors'].append((json_path, str(e)))
+                # A crashed worker (e.g. BrokenProcessPool) loses the whole batch
+                for json_path in futures[future]:
+                    logging.error(f"Error processing {json_path}: {e}")
+                    summary['errors'].append((json_path, str(e)))
 
     # Summary report
     print("Processing complete.")
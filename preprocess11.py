@@ -1,26 +1,31 @@
 import os
-import json
+import orjson
 import pandas as pd
 
+# Spaces, dots and hyphens in column names become underscores
+_COL_TRANS = str.maketrans({' ': '_', '.': '_', '-': '_'})
+
 def flatten_json(y, parent_key='', sep='_'):
     """
-    Recursively flattens a nested JSON/dictionary.
+    Iteratively flattens a nested JSON/dictionary using an explicit stack.
     Nested keys get joined with 'sep'.
+    For lists of dicts, each item gets an index in key.
+    For lists of primitives, joins as comma-separated string.
     """
     out = {}
-    def flatten(x, name=''):
+    # Stack of (value, key parts); children pushed in reverse to keep document order
+    stack = [(y, [parent_key] if parent_key else [])]
+    while stack:
+        x, parts = stack.pop()
         if isinstance(x, dict):
-            for a in x:
-                flatten(x[a], f"{name}{a}{sep}")
+            stack.extend((v, parts + [k]) for k, v in reversed(x.items()))
         elif isinstance(x, list):
             if all(isinstance(i, dict) for i in x):
-                for idx, a in enumerate(x):
-                    flatten(a, f"{name}{idx}{sep}")
+                stack.extend((a, parts + [str(idx)]) for idx, a in reversed(list(enumerate(x))))
             else:
-                out[name[:-1]] = ', '.join([str(i) for i in x])
+                out[sep.join(parts)] = ', '.join([str(i) for i in x])
         else:
-            out[name[:-1]] = x
-    flatten(y, parent_key)
+            out[sep.join(parts)] = x
     return out
 
 def json_file_to_flat_records(json_path):
@@ -28,8 +33,8 @@ def json_file_to_flat_records(json_path):
     Loads a JSON file and returns a list of flat dicts—one per top-level record.
     Handles varied Instagram JSON structures.
     """
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(json_path, 'rb') as f:
+        data = orjson.loads(f.read())
 
     # Try to determine the outer structure:
     if isinstance(data, dict):
@@ -66,7 +71,7 @@ def clean_and_standardize(df):
             except Exception:
                 pass
     # Clean column names
-    df.columns = [c.strip().replace(' ', '_').replace('.', '_').replace('-', '_') for c in df.columns]
+    df.columns = [c.strip().translate(_COL_TRANS) for c in df.columns]
     return df
 
 def process_all_jsons(input_root, output_root):